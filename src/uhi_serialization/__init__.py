@@ -7,8 +7,21 @@ UHI-serialization: An implementation of the UHI serialization format
 
 from __future__ import annotations
 
-from .hdf5_serialization import read_hdf5_schema, write_hdf5_schema
+from .hdf5_serialization import (
+    read_hdf5_projection,
+    read_hdf5_rebinned,
+    read_hdf5_schema,
+    write_hdf5_schema,
+    write_hdf5_sharded,
+)
 
 __version__ = "0.1.0"
 
-__all__ = ["__version__", "write_hdf5_schema", "read_hdf5_schema"]
+__all__ = [
+    "__version__",
+    "write_hdf5_schema",
+    "read_hdf5_schema",
+    "read_hdf5_projection",
+    "read_hdf5_rebinned",
+    "write_hdf5_sharded",
+]
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 import ast
+import itertools
+import math
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Any
 
@@ -8,7 +11,13 @@ import boost_histogram as bh
 import h5py
 import numpy as np
 
-__all__ = ["write_hdf5_schema", "read_hdf5_schema"]
+__all__ = [
+    "write_hdf5_schema",
+    "read_hdf5_schema",
+    "read_hdf5_projection",
+    "read_hdf5_rebinned",
+    "write_hdf5_sharded",
+]
 
 
 def __dir__() -> list[str]:
@@ -39,250 +48,515 @@ STORAGE_TYPES: dict[str, bh.storage.Storage] = {
 }
 
 
-def write_hdf5_schema(file_name: str, histograms: dict[str, bh.Histogram]) -> h5py.File:
-    f = h5py.File(file_name, "w")
+def write_hdf5_schema(
+    file_name: str | Path | h5py.File | h5py.Group,
+    histograms: dict[str, bh.Histogram],
+    base_path: str = ".",
+    flush: bool = False,
+    projections: dict[str, list[tuple[int, ...]]] | list[tuple[int, ...]] | None = None,
+    rebin_levels: int = 0,
+) -> h5py.File | h5py.Group:
+    """Serialize `histograms` into `file_name`.
+
+    `file_name` may be a path, in which case the file is created (truncating any
+    existing one) and closed once written, or an already open `h5py.File` /
+    `h5py.Group`, which is left open so that several calls can share one handle.
+    Histograms are written under `base_path` (relative to the given handle),
+    which is created if needed. `flush=True` flushes the file after writing.
+
+    `projections` (tuples of axis indices, either one list applied to every
+    histogram or a dict of lists keyed by histogram name) and `rebin_levels`
+    optionally store precomputed projections and power-of-two rebinned copies next
+    to each histogram, see `read_hdf5_projection` and `read_hdf5_rebinned`. All
+    projections are checked against their histograms before anything is written.
+    Rebin levels stop early at the first level that would not be coarser than the
+    previous one."""
+    if not isinstance(projections, dict):
+        projections = {name: projections or [] for name in histograms}
+    hist_projections = {name: projections.get(name, []) for name in histograms}
     for name, histogram in histograms.items():
-        # All referenced objects will be stored inside of /{name}/ref_storage
-        f.create_group(f"{name}")
-        group_prefix = f"/{name}"
-        f[group_prefix].create_group("ref_storage")
+        check_projections(name, histogram, hist_projections[name])
+    owns_file = not isinstance(file_name, (h5py.File, h5py.Group))
+    handle = h5py.File(file_name, "w") if owns_file else file_name
+    f = handle.require_group(base_path)
+    for name, histogram in histograms.items():
+        write_histogram_object(f, name, histogram)
+        if hist_projections[name] or rebin_levels > 0:
+            create_derived_objects(
+                f, name, histogram, hist_projections[name], rebin_levels
+            )
+    if owns_file:
+        handle.close()
+    elif flush:
+        handle.file.flush()
+    return handle
 
-        """
-        `metadata` code start
-        """
-        f[group_prefix].create_group("metadata")
-        f[group_prefix + "/metadata"].attrs[
-            "description"
-        ] = "Arbitrary metadata dictionary."
-        if histogram.metadata is not None:
-            for key, value in histogram.metadata.items():
-                f[group_prefix + "/metadata"].attrs[key] = value
-        """
-        `metadata` code end
-        """
 
-        """
-        `axes` code start
-        """
-        f[group_prefix].create_group("axes")
-        f[group_prefix + "/axes"].attrs[
-            "description"
-        ] = "A list of the axes of the histogram."
-        f[group_prefix + "/axes"].create_dataset(
-            "items", len(histogram.axes), dtype=h5py.special_dtype(ref=h5py.Reference)
-        )
-        for i, axis in enumerate(histogram.axes):
-            """Iterating through the axes, calling `create_axes_object` for each of them,
-            creating references to new groups and appending it to the `items` dataset defined above
-            """
-            current_axis = AXIS_MAP[str(axis)[: str(axis).index("(")]]
-            dataset = f[group_prefix + "/axes/items"]
-            args_dict: dict[str, object] = {}
-            if current_axis == "regular":
-                args_dict["bins"] = len(axis.edges) - 1
-                args_dict["lower"] = axis.edges[0]
-                args_dict["upper"] = axis.edges[-1]
-                args_dict["underflow"] = axis.traits.underflow
-                args_dict["overflow"] = axis.traits.overflow
-                args_dict["circular"] = axis.traits.circular
-            elif current_axis == "variable":
-                args_dict["edges"] = axis.edges
-                args_dict["underflow"] = axis.traits.underflow
-                args_dict["overflow"] = axis.traits.overflow
-                args_dict["circular"] = axis.traits.circular
-            elif current_axis == "boolean":
-                # NOTE: Boolean axes may only have `metadata` as user-input options
-                pass
-            elif current_axis == "category_int" or current_axis == "category_str":
-                s = str(axis)
-                args_dict["items"] = np.array(
-                    ast.literal_eval(s[s.find("[") : s.find("]") + 1]), dtype=object
-                )
-                args_dict["flow"] = axis.traits.growth
-
-            if axis.metadata is not None:
-                args_dict["metadata"] = axis.metadata
-                dataset[i] = create_axes_object(
-                    current_axis, f, name, i, True, args_dict
-                )[1]
-            else:
-                dataset[i] = create_axes_object(
-                    current_axis, f, name, i, False, args_dict
-                )[1]
-        """
-        `axes` code end
-        """
+def write_hdf5_sharded(
+    file_name: str | Path,
+    histograms: dict[str, bh.Histogram],
+    blocks: int = 1,
+    max_workers: int | None = None,
+) -> None:
+    """Serialize `histograms` in parallel into shard files next to `file_name`.
 
-        """
-        `storage` code start
-        """
-        f[group_prefix].create_group("storage")
-        f[group_prefix + "/storage"].attrs[
-            "description"
-        ] = "The storage of the bins of the histogram."
-        hist_str_type = str(histogram.storage_type)
-        hist_str_type = STORAGE_MAP[
-            hist_str_type[hist_str_type.find("e") + 2 : len(hist_str_type) - 2]
-        ]
-        args_dict = {}
-        args_dict["values"] = np.array(histogram.values())
-        if hist_str_type == "int_storage":
-            # NOTE: `int_storage` only has the stored values
-            pass
-        elif hist_str_type == "double_storage":
-            # NOTE: `double_storage` only has the stored values
-            pass
-        elif hist_str_type == "weighted_storage":
-            args_dict["variances"] = np.array(histogram.variances())
-        elif hist_str_type == "mean_storage":
-            args_dict["variances"] = np.array(histogram.variances())
-            args_dict["counts"] = np.array(histogram.counts())
-        elif hist_str_type == "weighted_mean_storage":
-            view = histogram.view()
-            assert isinstance(view, bh._internal.view.WeightedMeanView)
-            args_dict["variances"] = np.array(histogram.variances())
-            args_dict["sum_of_weights"] = view.sum_of_weights
-            args_dict["sum_of_weights_squared"] = view.sum_of_weights_squared
-
-        create_storage_object(hist_str_type, f, name, args_dict)
-        """
-        `storage` code end
-        """
-    f.close()
-    return f
+    With `blocks=1` every histogram is written whole into its own shard file by a
+    process pool and `file_name` only holds external links to them. With `blocks>1`
+    the storage arrays of each histogram are split along the first axis into that
+    many blocks, each written to its own shard file, while `file_name` holds the
+    metadata and axes plus virtual datasets mapping the blocks back together.
+    Either way `read_hdf5_schema(Path(file_name))` sees a single logical file, as
+    long as the shards are kept in the same directory."""
+    path = Path(file_name)
+    with ProcessPoolExecutor(max_workers) as pool, h5py.File(path, "w") as f:
+        futures = []
+        for k, (name, histogram) in enumerate(histograms.items()):
+            if blocks <= 1:
+                shard_name = f"{path.stem}.shard{k}{path.suffix}"
+                futures.append(
+                    pool.submit(
+                        create_shard_object,
+                        str(path.parent / shard_name),
+                        name,
+                        histogram,
+                    )
+                )
+                f[name] = h5py.ExternalLink(shard_name, f"/{name}")
+                continue
+            hist_str_type, args_dict = storage_object_args(histogram)
+            layouts = {
+                key: h5py.VirtualLayout(shape=array.shape, dtype=array.dtype)
+                for key, array in args_dict.items()
+            }
+            n_rows = histogram.axes[0].size
+            bounds = np.linspace(0, n_rows, blocks + 1, dtype=int)
+            for b, (lower, upper) in enumerate(itertools.pairwise(bounds)):
+                if lower == upper:
+                    continue
+                shard_name = f"{path.stem}.shard{k}_{b}{path.suffix}"
+                block = {key: array[lower:upper] for key, array in args_dict.items()}
+                futures.append(
+                    pool.submit(
+                        create_shard_object, str(path.parent / shard_name), name, block
+                    )
+                )
+                for key, array in block.items():
+                    layouts[key][lower:upper] = h5py.VirtualSource(
+                        shard_name,
+                        f"/{name}/{key}",
+                        shape=array.shape,
+                        dtype=array.dtype,
+                    )
+            write_histogram_object(f, name, histogram, (hist_str_type, layouts))
+        for future in futures:
+            future.result()
 
 
-def read_hdf5_schema(input_file: h5py.File | Path) -> dict[str, bh.Histogram]:
+def read_hdf5_schema(
+    input_file: h5py.File | h5py.Group | Path, base_path: str = "."
+) -> dict[str, bh.Histogram]:
+    """Deserialize every histogram stored under `base_path` of `input_file`, which
+    may be a path or an already open `h5py.File` / `h5py.Group`."""
     f = h5py.File(input_file) if isinstance(input_file, Path) else input_file
+    f = f[base_path]
     op_dict = {}
     # The first level in the schema are the various histograms that have been serialized
     for hist_name in list(f.keys()):
-        base_prefix = f"/{hist_name}"
-
-        #### `metadata` code start
-        metadata = {}
-        metadata_ref = f[base_prefix + "/metadata"]
-        for key, value in metadata_ref.attrs.items():
-            metadata[key] = value
-        #### `metadata` code end
-
-        #### `axes` code start
-        axes: list[bh.axis.Axis] = []
-        axes_ref = f[base_prefix + "/axes"]
-        for i, unref_axis_ref in enumerate(axes_ref["items"]):
-            deref_axis_ref = f[unref_axis_ref]
-            axis_type = deref_axis_ref.attrs["type"]
-            args_dict: dict[str, Any] = {}
-            # HACK: Force-adding the metadata field in `args_dict` allows me to avoid
-            # making if-else test around the existence of metadata for the current axis
-            args_dict["metadata"] = {}
-            for key, value in deref_axis_ref.attrs.items():
-                args_dict[key] = value
-            if axis_type == "regular":
-                axes.append(
-                    bh.axis.Regular(
-                        args_dict["bins"],
-                        args_dict["lower"],
-                        args_dict["upper"],
-                        overflow=args_dict["overflow"],
-                        underflow=args_dict["underflow"],
-                        circular=args_dict["circular"],
-                        metadata=args_dict["metadata"],
-                    )
-                )
-            elif axis_type == "variable":
-                args_dict["edges"] = np.array(deref_axis_ref[f"axis_{i}_edges"])
-                axes.append(
-                    bh.axis.Variable(
-                        args_dict["edges"],
-                        underflow=args_dict["underflow"],
-                        overflow=args_dict["overflow"],
-                        circular=args_dict["circular"],
-                        metadata=args_dict["metadata"],
-                    )
-                )
-            elif axis_type == "boolean":
-                axes.append(bh.axis.Boolean(metadata=args_dict["metadata"]))
-            elif axis_type == "category_int":
-                args_dict["items"] = np.array(
-                    deref_axis_ref[f"axis_{i}_categories"]
+        op_dict[hist_name] = read_histogram_object(f, hist_name)
+    return op_dict
+
+
+def read_hdf5_projection(
+    input_file: h5py.File | h5py.Group | Path,
+    hist_name: str,
+    axes: tuple[int, ...],
+    base_path: str = ".",
+) -> bh.Histogram:
+    """Return the projection of `hist_name` onto `axes`, read from the precomputed
+    copy if one was written, otherwise computed from the full histogram."""
+    f = h5py.File(input_file) if isinstance(input_file, Path) else input_file
+    f = f[base_path]
+    derived_name = projection_name(axes)
+    if derived_name in f.get(f"{hist_name}/projections", {}):
+        return read_histogram_object(f[f"{hist_name}/projections"], derived_name)
+    return read_histogram_object(f, hist_name).project(*axes)
+
+
+def read_hdf5_rebinned(
+    input_file: h5py.File | h5py.Group | Path,
+    hist_name: str,
+    level: int,
+    base_path: str = ".",
+) -> bh.Histogram:
+    """Return `hist_name` rebinned by a factor of `2**level` (see `rebin_histogram`),
+    read from the precomputed copy if one was written, otherwise computed from the
+    full histogram. Raises a `ValueError` for a negative `level` or one that would be
+    identical to the previous level."""
+    f = h5py.File(input_file) if isinstance(input_file, Path) else input_file
+    f = f[base_path]
+    derived_name = f"rebin_{level}"
+    if derived_name in f.get(f"{hist_name}/rebins", {}):
+        return read_histogram_object(f[f"{hist_name}/rebins"], derived_name)
+    return rebin_histogram(read_histogram_object(f, hist_name), level)
+
+
+def write_histogram_object(
+    f: h5py.File | h5py.Group,
+    name: str,
+    histogram: bh.Histogram,
+    storage_args: tuple[str, dict[str, Any]] | None = None,
+) -> h5py.Group:
+    """Helper function for serializing a single histogram into the new group /name of
+    the f group. `storage_args` overrides the output of `storage_object_args`"""
+    # All referenced objects will be stored inside of {base_path}/{name}/ref_storage
+    f.create_group(f"{name}")
+    group_prefix = f"{name}"
+    f[group_prefix].create_group("ref_storage")
+
+    """
+    `metadata` code start
+    """
+    f[group_prefix].create_group("metadata")
+    f[group_prefix + "/metadata"].attrs[
+        "description"
+    ] = "Arbitrary metadata dictionary."
+    if histogram.metadata is not None:
+        for key, value in histogram.metadata.items():
+            f[group_prefix + "/metadata"].attrs[key] = value
+    """
+    `metadata` code end
+    """
+
+    """
+    `axes` code start
+    """
+    f[group_prefix].create_group("axes")
+    f[group_prefix + "/axes"].attrs[
+        "description"
+    ] = "A list of the axes of the histogram."
+    f[group_prefix + "/axes"].create_dataset(
+        "items", len(histogram.axes), dtype=h5py.special_dtype(ref=h5py.Reference)
+    )
+    for i, axis in enumerate(histogram.axes):
+        """Iterating through the axes, calling `create_axes_object` for each of them,
+        creating references to new groups and appending it to the `items` dataset defined above
+        """
+        current_axis = AXIS_MAP[str(axis)[: str(axis).index("(")]]
+        dataset = f[group_prefix + "/axes/items"]
+        args_dict: dict[str, object] = {}
+        if current_axis == "regular":
+            args_dict["bins"] = len(axis.edges) - 1
+            args_dict["lower"] = axis.edges[0]
+            args_dict["upper"] = axis.edges[-1]
+            args_dict["underflow"] = axis.traits.underflow
+            args_dict["overflow"] = axis.traits.overflow
+            args_dict["circular"] = axis.traits.circular
+        elif current_axis == "variable":
+            args_dict["edges"] = axis.edges
+            args_dict["underflow"] = axis.traits.underflow
+            args_dict["overflow"] = axis.traits.overflow
+            args_dict["circular"] = axis.traits.circular
+        elif current_axis == "boolean":
+            # NOTE: Boolean axes may only have `metadata` as user-input options
+            pass
+        elif current_axis == "category_int" or current_axis == "category_str":
+            s = str(axis)
+            args_dict["items"] = np.array(
+                ast.literal_eval(s[s.find("[") : s.find("]") + 1]), dtype=object
+            )
+            args_dict["flow"] = axis.traits.growth
+
+        if axis.metadata is not None:
+            args_dict["metadata"] = axis.metadata
+            dataset[i] = create_axes_object(current_axis, f, name, i, True, args_dict)[
+                1
+            ]
+        else:
+            dataset[i] = create_axes_object(current_axis, f, name, i, False, args_dict)[
+                1
+            ]
+    """
+    `axes` code end
+    """
+
+    """
+    `storage` code start
+    """
+    f[group_prefix].create_group("storage")
+    f[group_prefix + "/storage"].attrs[
+        "description"
+    ] = "The storage of the bins of the histogram."
+    hist_str_type, args_dict = (
+        storage_args if storage_args is not None else storage_object_args(histogram)
+    )
+    create_storage_object(hist_str_type, f, name, args_dict)
+    """
+    `storage` code end
+    """
+    return f[group_prefix]
+
+
+def storage_object_args(histogram: bh.Histogram) -> tuple[str, dict[str, Any]]:
+    """Helper function for collecting the storage type and the arrays to be stored by
+    `create_storage_object` for the histogram"""
+    hist_str_type = str(histogram.storage_type)
+    hist_str_type = STORAGE_MAP[
+        hist_str_type[hist_str_type.find("e") + 2 : len(hist_str_type) - 2]
+    ]
+    args_dict: dict[str, Any] = {}
+    args_dict["values"] = np.array(histogram.values())
+    if hist_str_type == "int_storage":
+        # NOTE: `int_storage` only has the stored values
+        pass
+    elif hist_str_type == "double_storage":
+        # NOTE: `double_storage` only has the stored values
+        pass
+    elif hist_str_type == "weighted_storage":
+        args_dict["variances"] = np.array(histogram.variances())
+    elif hist_str_type == "mean_storage":
+        args_dict["variances"] = np.array(histogram.variances())
+        args_dict["counts"] = np.array(histogram.counts())
+    elif hist_str_type == "weighted_mean_storage":
+        view = histogram.view()
+        assert isinstance(view, bh._internal.view.WeightedMeanView)
+        args_dict["variances"] = np.array(histogram.variances())
+        args_dict["sum_of_weights"] = view.sum_of_weights
+        args_dict["sum_of_weights_squared"] = view.sum_of_weights_squared
+    return hist_str_type, args_dict
+
+
+def read_histogram_object(f: h5py.File | h5py.Group, hist_name: str) -> bh.Histogram:
+    """Helper function for deserializing the single histogram stored in /hist_name of
+    the f group"""
+    base_prefix = f"{hist_name}"
+
+    #### `metadata` code start
+    metadata = {}
+    metadata_ref = f[base_prefix + "/metadata"]
+    for key, value in metadata_ref.attrs.items():
+        metadata[key] = value
+    #### `metadata` code end
+
+    #### `axes` code start
+    axes: list[bh.axis.Axis] = []
+    axes_ref = f[base_prefix + "/axes"]
+    for i, unref_axis_ref in enumerate(axes_ref["items"]):
+        # NOTE: Dereferencing through `axes_ref` rather than `f` keeps this working when
+        # the histogram lives in another file behind an external link
+        deref_axis_ref = axes_ref[unref_axis_ref]
+        axis_type = deref_axis_ref.attrs["type"]
+        args_dict: dict[str, Any] = {}
+        # HACK: Force-adding the metadata field in `args_dict` allows me to avoid
+        # making if-else test around the existence of metadata for the current axis
+        args_dict["metadata"] = {}
+        for key, value in deref_axis_ref.attrs.items():
+            args_dict[key] = value
+        if axis_type == "regular":
+            axes.append(
+                bh.axis.Regular(
+                    args_dict["bins"],
+                    args_dict["lower"],
+                    args_dict["upper"],
+                    overflow=args_dict["overflow"],
+                    underflow=args_dict["underflow"],
+                    circular=args_dict["circular"],
+                    metadata=args_dict["metadata"],
                 )
-                axes.append(
-                    bh.axis.IntCategory(
-                        args_dict["items"],
-                        growth=args_dict["flow"],
-                        metadata=args_dict["metadata"],
-                    )
+            )
+        elif axis_type == "variable":
+            args_dict["edges"] = np.array(deref_axis_ref[f"axis_{i}_edges"])
+            axes.append(
+                bh.axis.Variable(
+                    args_dict["edges"],
+                    underflow=args_dict["underflow"],
+                    overflow=args_dict["overflow"],
+                    circular=args_dict["circular"],
+                    metadata=args_dict["metadata"],
                 )
-            elif axis_type == "category_str":
-                args_dict["items"] = np.array(
-                    deref_axis_ref[f"axis_{i}_categories"]
+            )
+        elif axis_type == "boolean":
+            axes.append(bh.axis.Boolean(metadata=args_dict["metadata"]))
+        elif axis_type == "category_int":
+            args_dict["items"] = np.array(deref_axis_ref[f"axis_{i}_categories"])
+            axes.append(
+                bh.axis.IntCategory(
+                    args_dict["items"],
+                    growth=args_dict["flow"],
+                    metadata=args_dict["metadata"],
                 )
-                axes.append(
-                    bh.axis.IntCategory(
-                        args_dict["items"],
-                        growth=args_dict["flow"],
-                        metadata=args_dict["metadata"],
-                    )
+            )
+        elif axis_type == "category_str":
+            args_dict["items"] = np.array(deref_axis_ref[f"axis_{i}_categories"])
+            axes.append(
+                bh.axis.IntCategory(
+                    args_dict["items"],
+                    growth=args_dict["flow"],
+                    metadata=args_dict["metadata"],
                 )
-        #### `axes` code end
-
-        #### `storage` code start
-        storage_ref = f[base_prefix + "/storage"]
-        storage_type = storage_ref.attrs["type"]
-        # NOTE: We construct the corresponding `bh.Histogram` object and assign the values
-        # from the serialization directly
-        h = bh.Histogram(
-            *axes,
-            storage=STORAGE_TYPES[{v: k for k, v in STORAGE_MAP.items()}[storage_type]],
+            )
+    #### `axes` code end
+
+    #### `storage` code start
+    storage_ref = f[base_prefix + "/storage"]
+    storage_type = storage_ref.attrs["type"]
+    # NOTE: We construct the corresponding `bh.Histogram` object and assign the values
+    # from the serialization directly
+    h = bh.Histogram(
+        *axes,
+        storage=STORAGE_TYPES[{v: k for k, v in STORAGE_MAP.items()}[storage_type]],
+    )
+    if storage_type == "int_storage":
+        h[...] = np.array(storage_ref["data"])
+    elif storage_type == "double_storage":
+        h[...] = np.array(storage_ref["data"])
+    elif storage_type == "weighted_storage":
+        h[...] = np.stack(
+            [np.array(storage_ref["data"]), np.array(storage_ref["variances"])],
+            axis=-1,
+        )
+    elif storage_type == "mean_storage":
+        h[...] = np.stack(
+            [
+                np.array(storage_ref["counts"]),
+                np.array(storage_ref["data"]),
+                np.array(storage_ref["variances"]),
+            ],
+            axis=-1,
         )
-        if storage_type == "int_storage":
-            h[...] = np.array(storage_ref["data"])
-        elif storage_type == "double_storage":
-            h[...] = np.array(storage_ref["data"])
-        elif storage_type == "weighted_storage":
-            h[...] = np.stack(
-                [np.array(storage_ref["data"]), np.array(storage_ref["variances"])],
-                axis=-1,
+    elif storage_type == "weighted_mean_storage":
+        h[...] = np.stack(
+            [
+                np.array(storage_ref["sum_of_weights"]),
+                np.array(storage_ref["sum_of_weights_squared"]),
+                np.array(storage_ref["data"]),
+                np.array(storage_ref["variances"]),
+            ],
+            axis=-1,
+        )
+    #### `storage` code end
+    return h
+
+
+def create_shard_object(
+    shard_name: str, name: str, content: bh.Histogram | dict[str, np.ndarray]
+) -> str:
+    """Helper function run by the `write_hdf5_sharded` workers. Writes either a whole
+    histogram, or one block of its storage arrays as plain datasets, into /name of a
+    new shard file"""
+    with h5py.File(shard_name, "w") as f:
+        if isinstance(content, bh.Histogram):
+            write_histogram_object(f, name, content)
+        else:
+            ref = f.create_group(name)
+            for key, array in content.items():
+                ref.create_dataset(key, shape=array.shape, data=array)
+    return shard_name
+
+
+def projection_name(axes: tuple[int, ...]) -> str:
+    """Name of the group holding the precomputed projection onto `axes`"""
+    return "projection_" + "_".join(str(axis) for axis in axes)
+
+
+def check_projections(
+    hist_name: str, histogram: bh.Histogram, projections: list[tuple[int, ...]]
+) -> None:
+    """Raises a `ValueError` unless every projection is a non-empty tuple of distinct,
+    valid axis indices of the histogram"""
+    for axes in projections:
+        if (
+            not axes
+            or len(set(axes)) != len(axes)
+            or not all(0 <= axis < histogram.ndim for axis in axes)
+        ):
+            msg = (
+                f"invalid projection {axes} for the {histogram.ndim}-D histogram "
+                f"{hist_name!r}"
             )
-        elif storage_type == "mean_storage":
-            h[...] = np.stack(
-                [
-                    np.array(storage_ref["counts"]),
-                    np.array(storage_ref["data"]),
-                    np.array(storage_ref["variances"]),
-                ],
-                axis=-1,
+            raise ValueError(msg)
+
+
+def rebin_factors(histogram: bh.Histogram, level: int) -> list[int]:
+    """Per-axis rebinning factors of `level`: the largest power of two up to `2**level`
+    dividing the number of bins of each continuous axis, and 1 for all other axes"""
+    return [
+        math.gcd(axis.size, 2**level)
+        if isinstance(axis, (bh.axis.Regular, bh.axis.Variable))
+        else 1
+        for axis in histogram.axes
+    ]
+
+
+def rebin_histogram(histogram: bh.Histogram, level: int) -> bh.Histogram:
+    """Merge neighbouring bins of each axis by its factor from `rebin_factors`, so that
+    every level is at least as coarse as the previous one on every axis. Raises a
+    `ValueError` for a negative level, or for a level that would be identical to the
+    previous one because no factor grows any further"""
+    if level < 0:
+        msg = f"rebin level must be non-negative, got {level}"
+        raise ValueError(msg)
+    factors = rebin_factors(histogram, level)
+    if level > 0 and factors == rebin_factors(histogram, level - 1):
+        msg = f"rebin level {level} is identical to level {level - 1}"
+        raise ValueError(msg)
+    return histogram[
+        {i: bh.rebin(factor) for i, factor in enumerate(factors) if factor > 1}
+    ]
+
+
+def create_derived_objects(
+    f: h5py.File | h5py.Group,
+    hist_name: str,
+    histogram: bh.Histogram,
+    projections: list[tuple[int, ...]],
+    rebin_levels: int,
+) -> h5py.Group:
+    """Helper function for storing precomputed projections in /hist_name/projections
+    and rebinned copies in /hist_name/rebins of the f group. Each of them is a full
+    histogram in the same schema, linked back to /hist_name through a `parent`
+    reference attribute"""
+    parent = f[hist_name]
+    if projections:
+        ref = parent.create_group("projections")
+        ref.attrs["description"] = "Precomputed projections of the histogram."
+        for axes in projections:
+            derived = write_histogram_object(
+                ref, projection_name(axes), histogram.project(*axes)
             )
-        elif storage_type == "weighted_mean_storage":
-            h[...] = np.stack(
-                [
-                    np.array(storage_ref["sum_of_weights"]),
-                    np.array(storage_ref["sum_of_weights_squared"]),
-                    np.array(storage_ref["data"]),
-                    np.array(storage_ref["variances"]),
-                ],
-                axis=-1,
+            derived.attrs["parent"] = parent.ref
+            derived.attrs["projection"] = np.array(axes, dtype=np.int64)
+    if rebin_levels > 0:
+        ref = parent.create_group("rebins")
+        ref.attrs[
+            "description"
+        ] = "Precomputed power-of-two rebinnings of the histogram."
+        for level in range(1, rebin_levels + 1):
+            # NOTE: Once no factor grows from one level to the next, every axis has
+            # run out of powers of two, so all remaining levels would only be copies
+            factors = rebin_factors(histogram, level)
+            if factors == rebin_factors(histogram, level - 1):
+                break
+            derived = write_histogram_object(
+                ref, f"rebin_{level}", rebin_histogram(histogram, level)
             )
-        #### `storage` code end
-
-        op_dict[hist_name] = h
-    return op_dict
+            derived.attrs["parent"] = parent.ref
+            derived.attrs["rebin_factors"] = np.array(factors, dtype=np.int64)
+    return parent
 
 
 def create_axes_object(
     axis_type: str,
-    hdf5_ptr: h5py.File,
+    hdf5_ptr: h5py.File | h5py.Group,
     hist_name: str,
     axis_num: int,
     has_metadata: bool,
     args_dict: dict[str, Any],
-) -> tuple[h5py.File, h5py.Reference]:
+) -> tuple[h5py.File | h5py.Group, h5py.Reference]:
     """Helper function for constructing and adding a new axis in the /ref_storage subfolder inside
-    /hist_name of the hdf5_ptr file"""
-    hist_folder_storage = hdf5_ptr[f"/{hist_name}/ref_storage"]
+    /hist_name of the hdf5_ptr group"""
+    hist_folder_storage = hdf5_ptr[f"{hist_name}/ref_storage"]
     ref = hist_folder_storage.create_group(f"axis_{axis_num}")
-    if axis_type ==  "regular":
+    if axis_type == "regular":
         ref.attrs["type"] = axis_type
         ref.attrs["description"] = "An evenly spaced set of continuous bins."
         ref.attrs["bins"] = args_dict["bins"]
@@ -294,7 +568,7 @@ def create_axes_object(
         if has_metadata:
             ref.create_group("metadata")
             for key, value in args_dict["metadata"].items():
-                ref["/metadata"].attrs[key] = value
+                ref["metadata"].attrs[key] = value
     elif axis_type == "variable":
         ref.attrs["type"] = axis_type
         ref.attrs["description"] = "A variably spaced set of continuous bins."
@@ -311,14 +585,14 @@ def create_axes_object(
         if has_metadata:
             ref.create_group("metadata")
             for key, value in args_dict["metadata"].items():
-                ref["/metadata"].attrs[key] = value
+                ref["metadata"].attrs[key] = value
     elif axis_type == "boolean":
         ref.attrs["type"] = axis_type
         ref.attrs["description"] = "A simple true/false axis with no flow."
         if has_metadata:
             ref.create_group("metadata")
             for key, value in args_dict["metadata"].items():
-                ref["/metadata"].attrs[key] = value
+                ref["metadata"].attrs[key] = value
     elif axis_type == "category_int":
         ref.attrs["type"] = axis_type
         ref.attrs["description"] = "A set of integer categorical bins in any order."
@@ -331,7 +605,7 @@ def create_axes_object(
         if has_metadata:
             ref.create_group("metadata")
             for key, value in args_dict["metadata"].items():
-                ref["/metadata"].attrs[key] = value
+                ref["metadata"].attrs[key] = value
     elif axis_type == "category_str":
         ref.attrs["type"] = axis_type
         ref.attrs["description"] = "A set of string categorical bins."
@@ -346,20 +620,22 @@ def create_axes_object(
         if has_metadata:
             ref.create_group("metadata")
             for key, value in args_dict["metadata"].items():
-                ref["/metadata"].attrs[key] = value
+                ref["metadata"].attrs[key] = value
     return (hdf5_ptr, ref.ref)
 
 
 def create_storage_object(
-    storage_type: str, hdf5_ptr: h5py.File, hist_name: str, args_dict: dict[str, Any]
-) -> h5py.File:
+    storage_type: str,
+    hdf5_ptr: h5py.File | h5py.Group,
+    hist_name: str,
+    args_dict: dict[str, Any],
+) -> h5py.File | h5py.Group:
     """Helper function for constructing and storing the main data in the /ref_storage
-    subfolder inside /hist_name of the hdf5_ptr file"""
-    ref = hdf5_ptr[f"/{hist_name}/storage"]
+    subfolder inside /hist_name of the hdf5_ptr group. The arrays in args_dict may also be
+    `h5py.VirtualLayout`s, see `create_storage_dataset`"""
+    ref = hdf5_ptr[f"{hist_name}/storage"]
     ref.attrs["type"] = storage_type
-    ref.create_dataset(
-        "data", shape=args_dict["values"].shape, data=args_dict["values"]
-    )
+    create_storage_dataset(ref, "data", args_dict["values"])
     # storage_type = STORAGE_MAP[storage_type]
     if storage_type == "int_storage":
         ref.attrs["description"] = "A storage holding integer counts."
@@ -369,40 +645,30 @@ def create_storage_object(
         ref.attrs[
             "description"
         ] = "A storage holding floating point counts and variances."
-        ref.create_dataset(
-            "variances",
-            shape=args_dict["variances"].shape,
-            data=args_dict["variances"],
-        )
+        create_storage_dataset(ref, "variances", args_dict["variances"])
     elif storage_type == "mean_storage":
         ref.attrs[
             "description"
         ] = "A storage holding 'profile'-style floating point counts, values, and variances."
-        ref.create_dataset(
-            "counts", shape=args_dict["counts"].shape, data=args_dict["counts"]
-        )
-        ref.create_dataset(
-            "variances",
-            shape=args_dict["variances"].shape,
-            data=args_dict["variances"],
-        )
+        create_storage_dataset(ref, "counts", args_dict["counts"])
+        create_storage_dataset(ref, "variances", args_dict["variances"])
     elif storage_type == "weighted_mean_storage":
         ref.attrs[
             "description"
         ] = "A storage holding 'profile'-style floating point ∑weights, ∑weights², values, and variances."
-        ref.create_dataset(
-            "variances",
-            shape=args_dict["variances"].shape,
-            data=args_dict["variances"],
-        )
-        ref.create_dataset(
-            "sum_of_weights",
-            shape=args_dict["sum_of_weights"].shape,
-            data=args_dict["sum_of_weights"],
-        )
-        ref.create_dataset(
-            "sum_of_weights_squared",
-            shape=args_dict["sum_of_weights_squared"].shape,
-            data=args_dict["sum_of_weights_squared"],
+        create_storage_dataset(ref, "variances", args_dict["variances"])
+        create_storage_dataset(ref, "sum_of_weights", args_dict["sum_of_weights"])
+        create_storage_dataset(
+            ref, "sum_of_weights_squared", args_dict["sum_of_weights_squared"]
         )
     return hdf5_ptr
+
+
+def create_storage_dataset(
+    ref: h5py.Group, name: str, data: np.ndarray | h5py.VirtualLayout
+) -> h5py.Dataset:
+    """Helper function for storing one array of the storage, either directly or as a
+    virtual dataset stitched together from the blocks written to shard files"""
+    if isinstance(data, h5py.VirtualLayout):
+        return ref.create_virtual_dataset(name, data)
+    return ref.create_dataset(name, shape=data.shape, data=data)
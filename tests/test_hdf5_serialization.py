@@ -4,9 +4,12 @@ from __future__ import annotations
 from pathlib import Path
 
 import boost_histogram as bh
+import h5py
 import numpy as np
+import pytest
 
 import uhi_serialization as s
+from uhi_serialization import hdf5_serialization
 
 
 def one_D_test_init(storage_type: str):
@@ -128,3 +131,183 @@ def test_mean_storage_read():
     assert np.allclose(
         actual_hist.counts(), re_constructed_hist.counts(), atol=1e-4, rtol=1e-9
     )
+
+
+def test_open_handle_write_read():
+    with h5py.File("test_open_handle.h5", "w") as f:
+        # pre-existing, unrelated content must survive
+        f.create_dataset("analysis/data", data=np.arange(5))
+        s.write_hdf5_schema(f, one_D_test_init("weighted"), base_path="hists/a")
+        s.write_hdf5_schema(f, one_D_test_init("mean"), base_path="hists/b", flush=True)
+        assert f["analysis/data"].shape == (5,)
+
+        h_a = s.read_hdf5_schema(f, base_path="hists/a")
+        h_b = s.read_hdf5_schema(f["hists"], base_path="b")
+
+    assert h_a.keys() == h_b.keys() == {"test_hist"}
+    assert h_a["test_hist"].storage_type == bh.storage.Weight
+    assert h_b["test_hist"].storage_type == bh.storage.Mean
+    assert np.allclose(
+        one_D_test_init("weighted")["test_hist"].values(), h_a["test_hist"].values()
+    )
+    assert np.allclose(
+        one_D_test_init("mean")["test_hist"].counts(), h_b["test_hist"].counts()
+    )
+
+
+def test_group_handle_default_base_path():
+    with h5py.File("test_group_handle.h5", "w") as f:
+        f.create_dataset("unrelated", data=np.arange(3))
+        s.write_hdf5_schema(f.create_group("grp"), one_D_test_init("weighted"))
+        assert set(f) == {"grp", "unrelated"}
+        assert set(f["grp"]) == {"test_hist"}
+
+        h_constructed = s.read_hdf5_schema(f["grp"])
+
+    assert h_constructed.keys() == {"test_hist"}
+    assert np.allclose(
+        one_D_test_init("weighted")["test_hist"].values(),
+        h_constructed["test_hist"].values(),
+    )
+
+
+def test_projection_and_rebin_pyramid():
+    h = bh.Histogram(
+        bh.axis.Regular(8, 0, 8),
+        bh.axis.Variable([0, 1, 2, 4, 8, 16, 32]),
+    )
+    h.fill([0.5, 1.5, 3.3, 7.1, 7.2], [0.5, 3.0, 9.0, 20.0, 31.0])
+    with h5py.File("test_pyramid.h5", "w") as f:
+        s.write_hdf5_schema(
+            f, {"test_hist": h}, projections=[(0,), (1, 0)], rebin_levels=2
+        )
+        assert set(f["test_hist/projections"]) == {"projection_0", "projection_1_0"}
+        assert set(f["test_hist/rebins"]) == {"rebin_1", "rebin_2"}
+        assert list(f["test_hist/rebins/rebin_2"].attrs["rebin_factors"]) == [4, 2]
+        assert f[f["test_hist/rebins/rebin_2"].attrs["parent"]] == f["test_hist"]
+
+        # precomputed
+        p = s.read_hdf5_projection(f, "test_hist", (1, 0))
+        assert np.allclose(p.values(), h.project(1, 0).values())
+        r = s.read_hdf5_rebinned(f, "test_hist", 2)
+        assert r.axes[0].size == 2
+        assert r.axes[1].size == 3
+        assert np.allclose(r.values(), h[{0: bh.rebin(4), 1: bh.rebin(2)}].values())
+
+        # computed on the fly
+        p = s.read_hdf5_projection(f, "test_hist", (1,))
+        assert np.allclose(p.values(), h.project(1).values())
+        r = s.read_hdf5_rebinned(f, "test_hist", 1)
+        assert np.allclose(r.values(), h[{0: bh.rebin(2), 1: bh.rebin(2)}].values())
+        r = s.read_hdf5_rebinned(f, "test_hist", 3)
+        assert [axis.size for axis in r.axes] == [1, 3]
+        assert np.allclose(r.values(), h[{0: bh.rebin(8), 1: bh.rebin(2)}].values())
+        with pytest.raises(ValueError, match="identical to level 3"):
+            s.read_hdf5_rebinned(f, "test_hist", 4)
+        with pytest.raises(ValueError, match="non-negative"):
+            s.read_hdf5_rebinned(f, "test_hist", -1)
+
+        # derived copies are not returned as separate histograms
+        assert s.read_hdf5_schema(f).keys() == {"test_hist"}
+
+
+def test_projections_with_mixed_dimensions():
+    histograms = {
+        "a": bh.Histogram(bh.axis.Regular(4, 0, 4), bh.axis.Regular(2, 0, 2)),
+        "b": bh.Histogram(bh.axis.Regular(4, 0, 4)),
+    }
+    with h5py.File("test_pyramid_mixed.h5", "w") as f:
+        with pytest.raises(ValueError, match="1-D histogram 'b'"):
+            s.write_hdf5_schema(f, histograms, projections=[(1,)])
+        # nothing is written when a projection does not fit
+        assert set(f) == set()
+
+        s.write_hdf5_schema(f, histograms, projections={"a": [(1,)]})
+        assert set(f["a/projections"]) == {"projection_1"}
+        assert "projections" not in f["b"]
+
+
+def test_rebin_levels_stop_when_no_axis_gets_coarser():
+    h = bh.Histogram(
+        bh.axis.Regular(8, 0, 8),
+        bh.axis.Variable([0, 1, 2, 4, 8, 16, 32]),
+    )
+    h.fill([0.5, 1.5, 3.3, 7.1, 7.2], [0.5, 3.0, 9.0, 20.0, 31.0])
+    with h5py.File("test_pyramid_stop.h5", "w") as f:
+        s.write_hdf5_schema(f, {"test_hist": h}, rebin_levels=5)
+        assert set(f["test_hist/rebins"]) == {"rebin_1", "rebin_2", "rebin_3"}
+
+        sizes = [
+            [axis.size for axis in s.read_hdf5_rebinned(f, "test_hist", level).axes]
+            for level in range(4)
+        ]
+        assert sizes == [[8, 6], [4, 3], [2, 3], [1, 3]]
+        with pytest.raises(ValueError, match="identical to level 3"):
+            s.read_hdf5_rebinned(f, "test_hist", 4)
+
+
+def two_D_test_init(storage: bh.storage.Storage, rows: int = 7) -> bh.Histogram:
+    h = bh.Histogram(
+        bh.axis.Regular(rows, 0, 7),
+        bh.axis.Variable([0, 1, 3, 6, 10]),
+        storage=storage,
+    )
+    x = [0.5, 1.5, 1.5, 3.2, 4.8, 6.9, 6.1]
+    y = [0.2, 2.5, 2.7, 5.0, 9.1, 0.9, 4.4]
+    if isinstance(storage, (bh.storage.Mean, bh.storage.WeightedMean)):
+        h.fill(x, y, sample=[1, 2, 3, 4, 5, 6, 7], weight=[1, 2, 1, 1, 3, 1, 2])
+    else:
+        h.fill(x, y, weight=[1, 2, 1, 1, 3, 1, 2])
+    return h
+
+
+def test_sharded_write_read():
+    histograms = {
+        "weighted": one_D_test_init("weighted")["test_hist"],
+        "mean": one_D_test_init("mean")["test_hist"],
+        "weighted_mean": one_D_test_init("weighted_mean")["test_hist"],
+        "int_2d": two_D_test_init(bh.storage.Int64()),
+        "double_2d": two_D_test_init(bh.storage.Double()),
+        "weighted_2d": two_D_test_init(bh.storage.Weight()),
+        "mean_2d": two_D_test_init(bh.storage.Mean()),
+        "weighted_mean_2d": two_D_test_init(bh.storage.WeightedMean()),
+        # fewer rows than blocks, leaving one block empty
+        "double_2d_short": two_D_test_init(bh.storage.Double(), rows=2),
+    }
+    s.write_hdf5_sharded("test_sharded.h5", histograms, max_workers=2)
+    s.write_hdf5_sharded("test_sharded_blocks.h5", histograms, blocks=3, max_workers=2)
+
+    with h5py.File("test_sharded_blocks.h5") as f:
+        for name, actual_hist in histograms.items():
+            storage_type, args_dict = hdf5_serialization.storage_object_args(
+                actual_hist
+            )
+            storage_ref = f[f"{name}/storage"]
+            assert storage_ref.attrs["type"] == storage_type
+            for key, array in args_dict.items():
+                dataset = storage_ref["data" if key == "values" else key]
+                assert dataset.is_virtual
+                assert dataset.shape == array.shape
+                assert np.array_equal(dataset[...], array, equal_nan=True)
+
+    for file_name in ["test_sharded.h5", "test_sharded_blocks.h5"]:
+        h_constructed = s.read_hdf5_schema(Path(file_name))
+        assert h_constructed.keys() == histograms.keys()
+        for name, actual_hist in histograms.items():
+            re_constructed_hist = h_constructed[name]
+            assert actual_hist.storage_type == re_constructed_hist.storage_type
+            assert actual_hist.ndim == re_constructed_hist.ndim
+            for actual_axis, re_constructed_axis in zip(
+                actual_hist.axes, re_constructed_hist.axes, strict=True
+            ):
+                assert actual_axis.traits == re_constructed_axis.traits
+                assert np.allclose(actual_axis.edges, re_constructed_axis.edges)
+            assert np.allclose(actual_hist.values(), re_constructed_hist.values())
+            if actual_hist.storage_type in (
+                bh.storage.Int64,
+                bh.storage.Double,
+                bh.storage.Weight,
+            ):
+                assert np.array_equal(actual_hist.view(), re_constructed_hist.view())
+            else:
+                assert np.allclose(actual_hist.counts(), re_constructed_hist.counts())